@@ -1,24 +1,88 @@
+import asyncio
 from fastapi import APIRouter, UploadFile, Form, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services import extractor, chunker, embedding
+from app.services.rag_pipeline import invalidate_session_caches
 from app.core.vector_client import VectorDB
 from app.core.database import get_db, Document
 from app.core.config import OLLAMA_EMBED_MODEL
 
 router = APIRouter()
 
+# Chunks per embedding request in the streaming upload pipeline.
+EMBED_MICRO_BATCH = 32
+
 @router.post("/upload")
 async def upload_document(
     file: UploadFile,
     chunk_strategy: str = Form("recursive"),
     session_id: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     VectorDB_instance = VectorDB(session_id)
-    text = extractor.extract_text_from_pdf(file)
-    chunks = chunker.chunk_text(text, strategy=chunk_strategy)
-    embeddings = embedding.create_ollama_embedding(chunks)
-    VectorDB_instance.upsert(chunks, embeddings)
+
+    # Streaming pipeline: pages flow into the embed worker as they are
+    # extracted, and embedded micro-batches flow into the upsert worker
+    # while later chunks are still being embedded — wall time becomes
+    # max(extract, embed, upsert) instead of their sum. The None sentinels
+    # only cover the clean path; if any stage raises, the other stages are
+    # cancelled below so nobody stays blocked on a full/empty queue.
+    chunks_q: asyncio.Queue = asyncio.Queue(maxsize=8)
+    upsert_q: asyncio.Queue = asyncio.Queue(maxsize=8)
+    total_chunks = 0
+
+    async def produce():
+        nonlocal total_chunks
+        async for page_text in extractor.iter_pdf_pages(file):
+            page_chunks = chunker.chunk_text(page_text, strategy=chunk_strategy)
+            total_chunks += len(page_chunks)
+            await chunks_q.put(page_chunks)
+        await chunks_q.put(None)
+
+    async def embed_worker():
+        buffer: list[str] = []
+        while True:
+            page_chunks = await chunks_q.get()
+            if page_chunks is None:
+                break
+            buffer.extend(page_chunks)
+            while len(buffer) >= EMBED_MICRO_BATCH:
+                batch, buffer = buffer[:EMBED_MICRO_BATCH], buffer[EMBED_MICRO_BATCH:]
+                embeddings = await embedding.create_ollama_embedding(batch)
+                await upsert_q.put((batch, embeddings))
+        if buffer:
+            embeddings = await embedding.create_ollama_embedding(buffer)
+            await upsert_q.put((buffer, embeddings))
+        await upsert_q.put(None)
+
+    async def upsert_worker():
+        id_offset = 0
+        while True:
+            item = await upsert_q.get()
+            if item is None:
+                break
+            batch, embeddings = item
+            await VectorDB_instance.upsert(batch, embeddings, id_offset=id_offset)
+            id_offset += len(batch)
+
+    stages = [
+        asyncio.create_task(produce()),
+        asyncio.create_task(embed_worker()),
+        asyncio.create_task(upsert_worker()),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    except BaseException:
+        # One stage failed (or we were cancelled): cancel the rest so a
+        # blocked put/get cannot deadlock, then surface the original error.
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        raise
+
+    # New documents change the retrievable context; drop the Gemini
+    # prefix cache and retire the answer/semantic/context cache entries.
+    await invalidate_session_caches(session_id)
 
     new_doc = Document(
         filename=file.filename,
@@ -27,6 +91,6 @@ async def upload_document(
         session_id=session_id
     )
     db.add(new_doc)
-    db.commit()
+    await db.commit()
     
-    return {"status": "success", "chunks": len(chunks)}
+    return {"status": "success", "chunks": total_chunks}
@@ -7,4 +7,6 @@ POSTGRES_URL = os.getenv("POSTGRES_URL")
 QDRANT_URL = os.getenv("QDRANT_URL")
 REDIS_HOST = os.getenv("REDIS_HOST")
 OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
\ No newline at end of file
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Opt-in SQL statement logging for debugging; off by default.
+SQL_ECHO = os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes")
\ No newline at end of file
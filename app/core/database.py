@@ -1,14 +1,17 @@
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.types import DateTime
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from app.core.config import POSTGRES_URL
+from app.core.config import POSTGRES_URL, SQL_ECHO
 
 
 Base = declarative_base()
-engine = create_engine(POSTGRES_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+engine = create_async_engine(
+    POSTGRES_URL.replace("postgresql://", "postgresql+asyncpg://"),
+    echo=SQL_ECHO,
+)
+AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 
 class Document(Base):
     __tablename__ = "documents"
@@ -29,13 +32,10 @@ class Booking(Base):
     date = Column(String, nullable=False)
     time = Column(String, nullable=False)
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-init_db()
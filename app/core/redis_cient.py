@@ -1,14 +1,55 @@
-import redis
 import json
+import redis.asyncio as redis
+import msgpack
+from redis.exceptions import ResponseError
 from app.core.config import REDIS_HOST
 
-r = redis.Redis(host=REDIS_HOST, port=6379, db=0)
+pool = redis.ConnectionPool(host=REDIS_HOST, port=6379, db=0)
+r = redis.Redis(connection_pool=pool)
 
-def get_memory(session_id: str):
-    data = r.get(session_id)
-    return json.loads(data) if data else []
+# Keep at most this many turns per session, and read back this many.
+MAX_HISTORY = 50
 
-def save_memory(session_id: str, query: str, answer: str):
-    history = get_memory(session_id)
-    history.append({"query": query, "answer": answer})
-    r.set(session_id, json.dumps(history))
+async def _migrate_legacy_history(session_id: str):
+    # Sessions written before the list format stored history as a JSON
+    # string under the same key; list commands raise WRONGTYPE on it.
+    # Convert the old entries to the list format in place so the
+    # conversation survives the upgrade.
+    data = await r.get(session_id)
+    try:
+        entries = json.loads(data) if data else []
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        entries = []
+    pipe = r.pipeline(transaction=False)
+    pipe.delete(session_id)
+    for entry in entries:
+        if isinstance(entry, dict):
+            pipe.rpush(session_id, msgpack.packb({
+                "query": entry.get("query", ""),
+                "answer": entry.get("answer", ""),
+            }))
+    pipe.ltrim(session_id, -MAX_HISTORY, -1)
+    await pipe.execute()
+
+async def get_memory(session_id: str):
+    try:
+        items = await r.lrange(session_id, -MAX_HISTORY, -1)
+    except ResponseError:
+        await _migrate_legacy_history(session_id)
+        items = await r.lrange(session_id, -MAX_HISTORY, -1)
+    return [msgpack.unpackb(item) for item in items]
+
+async def save_memory(session_id: str, query: str, answer: str):
+    # O(1) append instead of read-modify-write of the whole history.
+    packed = msgpack.packb({"query": query, "answer": answer})
+    pipe = r.pipeline(transaction=False)
+    pipe.rpush(session_id, packed)
+    pipe.ltrim(session_id, -MAX_HISTORY, -1)
+    try:
+        await pipe.execute()
+    except ResponseError:
+        await _migrate_legacy_history(session_id)
+        retry = r.pipeline(transaction=False)
+        retry.rpush(session_id, packed)
+        retry.ltrim(session_id, -MAX_HISTORY, -1)
+        await retry.execute()
@@ -1,34 +1,90 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import asyncio
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    VectorParams,
+    Distance,
+    Batch,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+)
 from app.core.config import QDRANT_URL
 
+# Points per upsert request; batches are sent concurrently.
+UPSERT_BATCH_SIZE = 64
+
+# One client (and connection pool) shared by every VectorDB instance,
+# instead of a fresh pool per request.
+_qdrant = AsyncQdrantClient(url=QDRANT_URL)
+
 class VectorDB:
+    # Collections this process already knows exist, so repeat requests
+    # skip the Qdrant round-trip entirely.
+    _known_collections: set[str] = set()
+
     def __init__(self, session_id:str):
-        self.client = QdrantClient(url=QDRANT_URL)
-        self.collection = f"rag_document_{session_id}" 
-        self._init_collection()
-
-    def _init_collection(self):
-        existing = [col.name for col in self.client.get_collections().collections]
-        if self.collection not in existing:
-            self.client.create_collection(
+        self.client = _qdrant
+        self.collection = f"rag_document_{session_id}"
+
+    async def _init_collection(self):
+        if self.collection in VectorDB._known_collections:
+            return
+        try:
+            await self.client.create_collection(
                 collection_name=self.collection,
-                vectors_config=VectorParams(size=768, distance=Distance.COSINE)
+                vectors_config=VectorParams(size=768, distance=Distance.COSINE),
+                # Store int8-quantized vectors in RAM (~4x smaller than
+                # fp32); search rescores against originals for accuracy.
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True)
+                ),
+            )
+        except UnexpectedResponse as e:
+            # Only a confirmed conflict means the collection already exists
+            # (created by an earlier request or another worker); anything
+            # else (transient 5xx, rejected config) must surface.
+            if e.status_code != 409 and b"already exists" not in (e.content or b""):
+                raise
+        except ValueError as e:
+            # Local-mode client reports an existing collection as ValueError.
+            if "already exists" not in str(e):
+                raise
+        VectorDB._known_collections.add(self.collection)
+
+    async def upsert(self, chunks: list[str], embeddings: list[list[float]], id_offset: int = 0):
+        await self._init_collection()
+        # Batch (parallel arrays) serializes once instead of validating a
+        # PointStruct per chunk; float32 also halves serialization work.
+        # id_offset lets streaming callers upsert incrementally without
+        # colliding point ids.
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        batches = [
+            Batch(
+                ids=list(range(id_offset + i, id_offset + min(i + UPSERT_BATCH_SIZE, len(chunks)))),
+                vectors=vectors[i:i + UPSERT_BATCH_SIZE].tolist(),
+                payloads=[{"text": c} for c in chunks[i:i + UPSERT_BATCH_SIZE]],
             )
-    
-    def upsert(self, chunks: list[str], embeddings: list[list[float]]):
-        points = [
-            PointStruct(id=i, vector=embeddings[i], payload={"text": chunks[i]})
-            for i in range(len(chunks))
+            for i in range(0, len(chunks), UPSERT_BATCH_SIZE)
         ]
-        self.client.upsert(collection_name=self.collection, points=points)
+        await asyncio.gather(*(
+            self.client.upsert(collection_name=self.collection, points=b, wait=False)
+            for b in batches
+        ))
 
-    def search(self, embedding: list[float], top_k: int = 5):
-        results = self.client.search(
+    async def search(self, embedding: list[float], top_k: int = 5):
+        await self._init_collection()
+        results = await self.client.search(
             collection_name=self.collection,
             query_vector=embedding,
             limit=top_k,
+            search_params=SearchParams(
+                quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+            ),
         )
-        return [r.payload["text"] for r in results]        
+        return [r.payload["text"] for r in results]
 
 # vector_db = VectorDB()
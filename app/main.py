@@ -9,5 +9,5 @@ app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await init_db()
     
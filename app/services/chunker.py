@@ -9,23 +9,79 @@ The splitter attempts to break on sentence boundaries (., !, ? and newlines)
 preferentially; if no boundary is available within the window it falls back to a
 hard split at the chunk_size. Overlap is applied between chunks.
 
-This module has no external dependencies and is safe to use for preparing
-documents before embedding.
+When the Rust-backed `semantic-text-splitter` package is installed it is used
+instead of the pure-Python loop — same sentence-aware behaviour, native speed.
+The pure-Python path remains as the fallback so the module still works with no
+external dependencies.
 """
 from __future__ import annotations
 
 import re
 from typing import List
 
+try:
+	from semantic_text_splitter import TextSplitter
+except ImportError:
+	TextSplitter = None
+
+# TextSplitter construction is not free; keep one per (capacity, overlap).
+_splitters: dict[tuple[int, int], "TextSplitter"] = {}
+
 
 SentenceBoundaryRegex = re.compile(r'[\.!?]["\']?\s+|\n+')
 
 
+_BOUNDARY_CHARS = (".", "!", "?", "\n")
+
+
+def _boundary_end(text: str, start: int, pos: int, end: int) -> int | None:
+	"""If text[pos] terminates a sentence boundary match within
+	text[start:end], return the match end (capped at `end`); otherwise None.
+	"""
+	i = pos + 1
+	if text[pos] == "\n":
+		# This newline may sit inside the greedy \s+ of a punctuation
+		# match; walk back over the whitespace run and check.
+		j = pos
+		while j > start and text[j - 1].isspace():
+			j -= 1
+		p = j - 1
+		if p >= start and text[p] in "\"'":
+			p -= 1
+		if p >= start and text[p] in ".!?":
+			while i < end and text[i].isspace():
+				i += 1
+			return i
+		while i < end and text[i] == "\n":
+			i += 1
+		return i
+	if i < end and text[i] in "\"'":
+		i += 1
+	if i < end and text[i].isspace():
+		i += 1
+		while i < end and text[i].isspace():
+			i += 1
+		return i
+	return None
+
+
 def _find_last_boundary(text: str, start: int, end: int) -> int | None:
 	"""Return the index (end position) of the last sentence boundary within
 	text[start:end]. If none found, return None.
 	"""
-	# Search for boundaries using finditer and keep last end <= end
+	# Fast path: rfind each boundary character from the right, which stops
+	# at the first hit instead of walking every match in the window.
+	best = -1
+	for ch in _BOUNDARY_CHARS:
+		pos = text.rfind(ch, start, end)
+		if pos > best:
+			best = pos
+	if best >= 0:
+		b_end = _boundary_end(text, start, best, end)
+		if b_end is not None:
+			return b_end
+	# Rightmost candidate was not a real boundary (e.g. the dot in "3.14");
+	# fall back to the full regex scan.
 	last: int | None = None
 	for m in SentenceBoundaryRegex.finditer(text, start, end):
 		last = m.end()
@@ -54,6 +110,13 @@ def chunk_text(text: str, strategy: str = "recursive") -> List[str]:
 		chunk_size = 800
 		overlap = 100
 
+	if TextSplitter is not None:
+		key = (chunk_size, overlap)
+		splitter = _splitters.get(key)
+		if splitter is None:
+			splitter = _splitters[key] = TextSplitter(chunk_size, overlap=overlap)
+		return splitter.chunks(text)
+
 	n = len(text)
 	if n <= chunk_size:
 		return [text]
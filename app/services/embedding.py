@@ -1,14 +1,65 @@
-import requests
+import array
+import asyncio
+import hashlib
+import httpx
 from app.core.config import OLLAMA_EMBED_MODEL
+from app.core.redis_cient import r
 
-def create_ollama_embedding(texts: list[str]) -> list[list[float]]:
-    embeddings = []
-    for txt in texts:
-        resp = requests.post(
-            "http://localhost:11434/api/embeddings",
-            json={"model": OLLAMA_EMBED_MODEL, "prompt": txt},
-            timeout=30
-        )
-        resp.raise_for_status()
-        embeddings.append(resp.json()["embedding"])
-    return embeddings
\ No newline at end of file
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embed"
+# Size of the sub-batches fanned out concurrently to Ollama.
+BATCH_SIZE = 64
+# How long cached embeddings live in Redis (one day).
+EMBED_CACHE_TTL = 86400
+
+_client = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_connections=16),
+)
+
+def _cache_key(text: str) -> str:
+    digest = hashlib.sha1((OLLAMA_EMBED_MODEL or "") .encode() + text.encode()).hexdigest()
+    return f"emb:{digest}"
+
+def _pack(vec: list[float]) -> bytes:
+    # float32 bytes: ~3 KB per 768-dim vector vs ~15 KB as JSON.
+    return array.array("f", vec).tobytes()
+
+def _unpack(data: bytes) -> list[float]:
+    vec = array.array("f")
+    vec.frombytes(data)
+    return vec.tolist()
+
+async def _embed_batch(texts: list[str]) -> list[list[float]]:
+    resp = await _client.post(
+        OLLAMA_EMBED_URL,
+        json={"model": OLLAMA_EMBED_MODEL, "input": texts},
+    )
+    resp.raise_for_status()
+    return resp.json()["embeddings"]
+
+async def create_ollama_embedding(texts: list[str]) -> list[list[float]]:
+    if not texts:
+        return []
+
+    # Look up all texts in the Redis cache in one MGET, then embed only
+    # the misses.
+    keys = [_cache_key(t) for t in texts]
+    cached = await r.mget(keys)
+    embeddings: list[list[float] | None] = [
+        _unpack(data) if data else None for data in cached
+    ]
+
+    miss_indices = [i for i, e in enumerate(embeddings) if e is None]
+    if miss_indices:
+        miss_texts = [texts[i] for i in miss_indices]
+        batches = [miss_texts[i:i + BATCH_SIZE] for i in range(0, len(miss_texts), BATCH_SIZE)]
+        results = await asyncio.gather(*(_embed_batch(b) for b in batches))
+        new_embeddings = [emb for batch in results for emb in batch]
+
+        pipe = r.pipeline(transaction=False)
+        for i, emb in zip(miss_indices, new_embeddings):
+            embeddings[i] = emb
+            pipe.set(keys[i], _pack(emb), ex=EMBED_CACHE_TTL)
+        await pipe.execute()
+
+    return embeddings
@@ -1,14 +1,42 @@
+import asyncio
 import pymupdf as fitz
 from fastapi import UploadFile
 
-def extract_text_from_pdf(file: UploadFile) -> str:
+async def extract_text_from_pdf(file: UploadFile) -> str:
     """
     Extract text content from an uploaded PDF file.
+
+    The upload is read with the async API (UploadFile already spools large
+    bodies to a temp file) and PDF parsing runs in a worker thread so the
+    event loop is never blocked on libmupdf.
+    """
+    data = await file.read()
+    if file.filename.endswith('.pdf'):
+        def _extract() -> str:
+            with fitz.open(stream=data, filetype="pdf") as pdf_document:
+                return "\n".join(page.get_text() for page in pdf_document)
+        return await asyncio.to_thread(_extract)
+    elif file.filename.endswith('.txt'):
+        return data.decode('utf-8')
+    else:
+        raise ValueError("Unsupported file type. Only PDF and TXT are supported.")
+
+async def iter_pdf_pages(file: UploadFile):
+    """
+    Yield the text of each page of an uploaded PDF as soon as it is
+    extracted, so downstream work (chunk/embed/upsert) can start before
+    the whole document is parsed. Each page's extraction runs in a worker
+    thread. A .txt upload yields its whole content as one "page".
     """
+    data = await file.read()
     if file.filename.endswith('.pdf'):
-        pdf_document = fitz.open(stream=file.file.read(), filetype="pdf")
-        return "\n".join([page.get_text() for page in pdf_document])
+        pdf_document = await asyncio.to_thread(fitz.open, stream=data, filetype="pdf")
+        try:
+            for page in pdf_document:
+                yield await asyncio.to_thread(page.get_text)
+        finally:
+            pdf_document.close()
     elif file.filename.endswith('.txt'):
-        return (file.read()).decode('utf-8')
+        yield data.decode('utf-8')
     else:
         raise ValueError("Unsupported file type. Only PDF and TXT are supported.")
@@ -1,24 +1,219 @@
+import asyncio
+import hashlib
 import json
 import re
-import requests
+import httpx
+import numpy as np
+import orjson
 from typing import Dict
 
+try:
+	# DFA-based engine — no catastrophic backtracking on adversarial input.
+	import re2 as re_fast
+except ImportError:
+	re_fast = re
+
 from app.core.vector_client import VectorDB
-from app.core.redis_cient import get_memory, save_memory
+from app.core.redis_cient import r, get_memory, save_memory
 from app.services.embedding import create_ollama_embedding
-from app.core.database import Booking, SessionLocal
+from app.core.database import Booking, AsyncSessionLocal
 from app.core.config import GEMINI_API_KEY
 
+# Shared keep-alive client for Gemini so each call reuses one TCP+TLS
+# connection instead of handshaking from scratch; HTTP/2 lets concurrent
+# calls (e.g. booking parse + chat answer) multiplex over that connection.
+_gemini_http = httpx.AsyncClient(
+	http2=True,
+	timeout=60,
+	limits=httpx.Limits(max_keepalive_connections=8),
+)
+
+GEMINI_MODEL = "models/gemini-2.0-flash"
+GEMINI_URL = (
+	f"https://generativelanguage.googleapis.com/v1beta/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+)
+GEMINI_CACHE_URL = (
+	f"https://generativelanguage.googleapis.com/v1beta/cachedContents?key={GEMINI_API_KEY}"
+)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Gemini context cache: the (context + history) prompt prefix is uploaded
+# once per session so later turns only pay prefill for the new question.
+PROMPT_CACHE_TTL = 900
+
+
+async def _gemini_generate(prompt: str, timeout: float | None = None, cached_content: str | None = None) -> dict:
+	"""POST a single-prompt generateContent request and return the parsed
+	response. Serialization and parsing go through orjson, which is much
+	faster than stdlib json for Gemini's large response payloads.
+	"""
+	payload = {"contents": [{"parts": [{"text": prompt}]}]}
+	if cached_content:
+		payload["cachedContent"] = cached_content
+	resp = await _gemini_http.post(
+		GEMINI_URL,
+		content=orjson.dumps(payload),
+		headers=_JSON_HEADERS,
+		timeout=timeout or httpx.USE_CLIENT_DEFAULT,
+	)
+	resp.raise_for_status()
+	return orjson.loads(resp.content)
+
+
+async def _get_prompt_cache(session_id: str, prefix_digest: str) -> str | None:
+	"""Return the session's cachedContents name, but only if it was built
+	from exactly this prefix — retrieval may produce different chunks for
+	a different question, and answering against stale context is worse
+	than paying full prefill."""
+	data = await r.get(f"gemini_cache:{session_id}")
+	if not data:
+		return None
+	entry = orjson.loads(data)
+	if entry.get("prefix_digest") != prefix_digest:
+		return None
+	return entry.get("name")
+
+
+async def _create_prompt_cache(session_id: str, prefix: str, prefix_digest: str) -> None:
+	"""Upload the prompt prefix to Gemini's cachedContents, best-effort.
+
+	Failures (e.g. prefix below the API's minimum token count) are ignored
+	— the next turn simply sends the full prompt again.
+	"""
+	body = orjson.dumps({
+		"model": GEMINI_MODEL,
+		"contents": [{"role": "user", "parts": [{"text": prefix}]}],
+		"ttl": f"{PROMPT_CACHE_TTL}s",
+	})
+	try:
+		resp = await _gemini_http.post(GEMINI_CACHE_URL, content=body, headers=_JSON_HEADERS)
+		resp.raise_for_status()
+		name = orjson.loads(resp.content).get("name")
+	except httpx.HTTPError:
+		return
+	if name:
+		await r.setex(
+			f"gemini_cache:{session_id}",
+			PROMPT_CACHE_TTL,
+			orjson.dumps({"name": name, "prefix_digest": prefix_digest}),
+		)
+
+
+async def invalidate_prompt_cache(session_id: str) -> None:
+	"""Drop the session's cached prefix, e.g. after new documents change
+	the retrievable context."""
+	await r.delete(f"gemini_cache:{session_id}")
+
+
+async def invalidate_session_caches(session_id: str) -> None:
+	"""Invalidate everything derived from the session's retrievable
+	context after an upload: the Gemini prefix cache plus — by bumping the
+	generation folded into their keys — the exact-answer, semantic and
+	retrieved-context caches."""
+	pipe = r.pipeline(transaction=False)
+	pipe.delete(f"gemini_cache:{session_id}")
+	pipe.incr(f"cachegen:{session_id}")
+	await pipe.execute()
+
+# Semantic cache: queries are bucketed by the sign pattern of 16 random
+# projections of their embedding, so near-duplicate questions land on the
+# same Redis key and skip the Gemini call entirely.
+SEMANTIC_CACHE_TTL = 900
+# Retrieved-context cache: identical embeddings fetch the same chunks,
+# so skip the Qdrant query for repeats.
+CONTEXT_CACHE_TTL = 900
+SEMANTIC_CACHE_MIN_SIM = 0.95
+_LSH_BITS = 16
+_lsh_planes = np.random.default_rng(42).standard_normal((_LSH_BITS, 768))
+
+
+def _semantic_cache_key(session_id: str, generation: str, embedding: list[float]) -> str:
+	bits = (_lsh_planes @ np.asarray(embedding)) > 0
+	sig = 0
+	for bit in bits:
+		sig = (sig << 1) | int(bit)
+	return f"sem:{session_id}:{generation}:{sig}"
+
+
+async def _cache_generation(session_id: str) -> str:
+	"""Current cache generation for the session. Uploads bump it, which
+	orphans every answer/semantic/context entry keyed under the old value.
+	"""
+	gen = await r.get(f"cachegen:{session_id}")
+	return gen.decode() if gen else "0"
+
+
+def _cosine_similarity(a: list[float], b: list[float]) -> float:
+	a = np.asarray(a)
+	b = np.asarray(b)
+	denom = np.linalg.norm(a) * np.linalg.norm(b)
+	return float(a @ b / denom) if denom else 0.0
+
+
+async def _semantic_cache_get(key: str, embedding: list[float]):
+	data = await r.get(key)
+	if not data:
+		return None
+	entry = json.loads(data)
+	# Same bucket does not guarantee near-identical queries; verify.
+	if _cosine_similarity(entry["embedding"], embedding) < SEMANTIC_CACHE_MIN_SIM:
+		return None
+	return entry["answer"]
+
+
+async def _semantic_cache_set(key: str, embedding: list[float], answer: str):
+	await r.setex(key, SEMANTIC_CACHE_TTL, json.dumps({"embedding": embedding, "answer": answer}))
+
+
+# Precompiled once; each search was recompiling and rescanning before.
+NAME_RE = re_fast.compile(r"name\s+is\s+(\w+)", re_fast.IGNORECASE)
+EMAIL_RE = re_fast.compile(r"[\w\.-]+@[\w\.-]+")
+DATE_RE = re_fast.compile(r"(\d{4}-\d{2}-\d{2})")
+TIME_RE = re_fast.compile(r"(\d{1,2}:\d{2})")
+
+
+def _extract_json_object(text: str) -> str | None:
+	"""Return the first balanced {...} object in `text`, or None.
+
+	Single O(n) pass tracking brace depth (string-aware), instead of the
+	old re.search(r"\\{.*\\}", text, re.S) which backtracks badly on long
+	LLM output.
+	"""
+	start = text.find("{")
+	if start == -1:
+		return None
+	depth = 0
+	in_string = False
+	escaped = False
+	for i in range(start, len(text)):
+		ch = text[i]
+		if in_string:
+			if escaped:
+				escaped = False
+			elif ch == "\\":
+				escaped = True
+			elif ch == '"':
+				in_string = False
+		elif ch == '"':
+			in_string = True
+		elif ch == "{":
+			depth += 1
+		elif ch == "}":
+			depth -= 1
+			if depth == 0:
+				return text[start:i + 1]
+	return None
+
 
 def _parse_booking_fallback(query: str) -> Dict[str, str]:
 	"""Original regex-based fallback parser.
 
 	Keeps behaviour compatible with previous implementation in case LLM fails.
 	"""
-	name = re.search(r"name\s+is\s+(\w+)", query, re.IGNORECASE)
-	email = re.search(r"[\w\.-]+@[\w\.-]+", query)
-	date = re.search(r"(\d{4}-\d{2}-\d{2})", query)
-	time = re.search(r"(\d{1,2}:\d{2})", query)
+	name = NAME_RE.search(query)
+	email = EMAIL_RE.search(query)
+	date = DATE_RE.search(query)
+	time = TIME_RE.search(query)
 
 
 	return {
@@ -28,7 +223,7 @@ def _parse_booking_fallback(query: str) -> Dict[str, str]:
 		"time": time.group(1) if time else "TBD",
 	}
 
-def parse_booking(query: str) -> Dict[str, str]:
+async def parse_booking(query: str) -> Dict[str, str]:
 	"""Extract booking fields (name, email, date, time) using Gemini LLM.
 
 	The function will call the configured Gemini endpoint and instruct it to
@@ -47,18 +242,8 @@ def parse_booking(query: str) -> Dict[str, str]:
 		f"User text:\n" + query
 	)
 
-	gemini_url = (
-		f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-	)
-
 	# try:
-	resp = requests.post(
-		gemini_url,
-		json={"contents": [{"parts": [{"text": prompt}]}]},
-		timeout=30,
-	)
-	resp.raise_for_status()
-	resp_json = resp.json()
+	resp_json = await _gemini_generate(prompt, timeout=30)
 	# The API returns the model text in candidates -> content -> parts -> text
 	text = (
 		resp_json.get("candidates", [{}])[0]
@@ -72,11 +257,10 @@ def parse_booking(query: str) -> Dict[str, str]:
 		pass
 
 	# Try to find a JSON object in the model output
-	m = re.search(r"\{.*\}", text, re.S)
-	if m:
-		json_text = m.group(0)
+	json_text = _extract_json_object(text)
+	if json_text:
 		try:
-			parsed = json.loads(json_text)
+			parsed = orjson.loads(json_text)
 			# Ensure keys exist and default if not
 			returned = {
 				"name": parsed.get("name", "Unknown") if isinstance(parsed, dict) else "Unknown",
@@ -87,7 +271,7 @@ def parse_booking(query: str) -> Dict[str, str]:
 			}
 			print(returned,end="\n\n\n\n\n\n\n")
 			return returned
-		except json.JSONDecodeError:
+		except orjson.JSONDecodeError:
 			# Fall through to fallback
 			# return _parse_booking_fallback(query)
 			pass
@@ -95,12 +279,32 @@ def parse_booking(query: str) -> Dict[str, str]:
 
 async def generate_response(query: str, session_id: str):
 	vectorDBInstance = VectorDB(session_id)
-	history = get_memory(session_id)
 
 	interview_status = None
+	is_booking = any(keyword in query.lower() for keyword in ["book interview", "book a interview", "schedule interview", "schedule a interview", "interview", "book", "schedule"])
 
-	if any(keyword in query.lower() for keyword in ["book interview", "book a interview", "schedule interview", "schedule a interview", "interview", "book", "schedule"]):
-		booking_data = parse_booking(query)
+	# Exact-match answer cache: a verbatim repeat returns before paying
+	# for history, embedding or retrieval. Checked ahead of the LSH cache
+	# so verbatim repeats can never be false negatives. All three
+	# context-derived caches fold in the generation, so entries from
+	# before the last upload are never served.
+	generation = await _cache_generation(session_id)
+	exact_key = f"ans:{session_id}:{generation}:{hashlib.sha1(query.encode()).hexdigest()}"
+	if not is_booking:
+		cached = await r.get(exact_key)
+		if cached is not None:
+			answer = cached.decode()
+			await save_memory(session_id, query, answer)
+			return answer
+
+	# Memory fetch and query embedding are independent of the booking
+	# parse — start all three now so they overlap; the HTTP/2 client lets
+	# the booking call share the Gemini connection with the answer call.
+	history_task = asyncio.create_task(get_memory(session_id))
+	embedding_task = asyncio.create_task(create_ollama_embedding([query]))
+
+	if is_booking:
+		booking_data = await parse_booking(query)
 		print(booking_data,end="\n\n\n\n\n\n\n")
 		print(booking_data.get("booking_status"))
 
@@ -110,9 +314,9 @@ async def generate_response(query: str, session_id: str):
 			interview_status = "No interview booked."
 		else:
 			booking_data.pop("booking_status", None)
-			db = SessionLocal()
-			db.add(Booking(**booking_data)) 
-			db.commit()
+			async with AsyncSessionLocal() as db:
+				db.add(Booking(**booking_data))
+				await db.commit()
 			interview_status = f"Interview booked for {booking_data['name']} on {booking_data['date']} at {booking_data['time']}"
 
 		# except Exception:
@@ -120,45 +324,78 @@ async def generate_response(query: str, session_id: str):
 		# 	pass
 
 	# Embed query locally with Ollama
-	embedding = create_ollama_embedding([query])[0]
+	embedding = (await embedding_task)[0]
+
+	# Semantic cache: skip retrieval + Gemini for repeated/near-duplicate
+	# queries. Booking turns have side effects, so they bypass the cache.
+	cache_key = _semantic_cache_key(session_id, generation, embedding)
+	if interview_status is None:
+		cached_answer = await _semantic_cache_get(cache_key, embedding)
+		if cached_answer is not None:
+			await history_task
+			await save_memory(session_id, query, cached_answer)
+			return cached_answer
 
-	# Retrieve context
-	context_chunks = vectorDBInstance.search(embedding)
+	# Retrieve context, reusing cached chunks for identical embeddings
+	emb_digest = hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+	ctx_key = f"ctx:{session_id}:{generation}:{emb_digest}"
+	cached_ctx = await r.get(ctx_key)
+	if cached_ctx:
+		context_chunks = json.loads(cached_ctx)
+		history = await history_task
+	else:
+		history, context_chunks = await asyncio.gather(
+			history_task, vectorDBInstance.search(embedding)
+		)
+		await r.setex(ctx_key, CONTEXT_CACHE_TTL, json.dumps(context_chunks))
 	# If vector_db returns objects, normalize to text; otherwise assume list[str]
 	if context_chunks and isinstance(context_chunks[0], dict):
 		context_text = "\n".join(c.get("text", "") for c in context_chunks)
 	else:
 		context_text = "\n".join(context_chunks or [])
 
-	# Build prompt for Gemini
-	full_prompt = f"""
+	# Build prompt for Gemini. Only the retrieved context goes in the
+	# cacheable prefix; history grows every turn, so it rides in the
+	# per-turn suffix — otherwise cache-hit turns would answer against a
+	# conversation frozen at cache-creation time.
+	prompt_prefix = f"""
         You are a helpful assistant.
         Context:
 		if interview is booked then confirm the interview with details {interview_status} else do not mention anything about interview.
         {context_text}
-        Conversation so far:
+        """
+	prompt_suffix = f"""Conversation so far:
         {history}
         User: {query}
         Answer helpfully based on context.
         """
+	full_prompt = prompt_prefix + prompt_suffix
 
-    
-	gemini_url = (
-		f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
-	)
 	print(full_prompt)
-	resp = requests.post(
-		gemini_url,
-		json={"contents": [{"parts": [{"text": full_prompt}]}]},
-		timeout=60,
-	)
-	resp.raise_for_status()
-	resp_json = resp.json()
+	# Booking turns embed dynamic status in the prefix, so only plain
+	# turns use the cached prefix; the digest check rejects a cache built
+	# from different retrieved chunks.
+	resp_json = None
+	prefix_digest = hashlib.sha1(prompt_prefix.encode()).hexdigest()
+	cache_name = await _get_prompt_cache(session_id, prefix_digest) if interview_status is None else None
+	if cache_name:
+		try:
+			resp_json = await _gemini_generate(prompt_suffix, cached_content=cache_name)
+		except httpx.HTTPStatusError:
+			# Cache expired or was rejected — fall back to the full prompt.
+			await invalidate_prompt_cache(session_id)
+	if resp_json is None:
+		resp_json = await _gemini_generate(full_prompt)
+		if interview_status is None:
+			await _create_prompt_cache(session_id, prompt_prefix, prefix_digest)
 	print(resp_json)
 
 
 	ans = resp_json.get("candidates", [{}])[0].get("content", [{}]).get("parts", [{}])[0].get("text", "")
-	save_memory(session_id, query, ans)
+	if interview_status is None:
+		await _semantic_cache_set(cache_key, embedding, ans)
+		await r.setex(exact_key, SEMANTIC_CACHE_TTL, ans)
+	await save_memory(session_id, query, ans)
 	# # return answer
 	return ans
 